@@ -6,57 +6,39 @@ Hugo CMS Companion - A web application for managing Hugo sites
 import os
 import sys
 import json
+import csv
+import io
 import subprocess
 import shutil
+import atexit
+import stat
+import errno
+import mimetypes
 import tempfile
+import getpass
+import socket
+import threading
+import time
+import uuid
+import hashlib
+import gzip
 from pathlib import Path
+from functools import lru_cache
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory, Response, session
 from jinja2 import Template
+from werkzeug.exceptions import NotFound
 import yaml
 import frontmatter
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import re
-from urllib.parse import unquote
+from urllib.parse import unquote, urlparse
 from dotenv import load_dotenv  # For .env file support
 import logging
 from datetime import datetime
 
-# Initialize git module with proper error handling
-def init_git():
-    """Initialize GitPython with proper error handling"""
-    try:
-        # Set environment variable to suppress git warnings
-        os.environ['GIT_PYTHON_REFRESH'] = 'quiet'
-        
-        import git
-        
-        # Try common git executable paths
-        git_paths = ['/usr/bin/git', '/bin/git', '/usr/local/bin/git']
-        
-        for git_path in git_paths:
-            if os.path.exists(git_path):
-                try:
-                    git.refresh(git_path)
-                    print(f"Git initialized with executable: {git_path}")
-                    return git, None
-                except:
-                    continue
-        
-        # If no specific path works, try default refresh
-        try:
-            git.refresh()
-            return git, None
-        except:
-            pass
-            
-        return None, "Git executable not found in common paths"
-        
-    except ImportError as e:
-        return None, f"Git import error: {str(e)}"
-    except Exception as e:
-        return None, f"Unexpected git error: {str(e)}"
-
 # Load environment variables from .env file
 load_dotenv()
 
@@ -67,19 +49,68 @@ logging.basicConfig(
 )
 security_logger = logging.getLogger('hugo-cms-security')
 
+# WSGI environ keys holding the client address, most specific first
+CLIENT_IP_ENVIRON_KEYS = ('HTTP_X_FORWARDED_FOR', 'REMOTE_ADDR')
+
+def get_client_ip():
+    """Return the requesting client's IP address for security logs"""
+    for key in CLIENT_IP_ENVIRON_KEYS:
+        client_ip = request.environ.get(key)
+        if client_ip:
+            return client_ip
+    return 'unknown'
+
 app = Flask(__name__)
 
+# Resolve the git executable once rather than searching PATH per command
+GIT_EXECUTABLE = shutil.which('git')
+
 # Global file watcher observer
 file_observer = None
 
+# Long-running `hugo server` process when HUGO_SERVER_MODE is enabled
+hugo_server_process = None
+hugo_server_renders = 0  # Renders hugo server has reported finishing
+hugo_server_render_cond = threading.Condition()
+
+# Builds, pushes and re-clones all mutate the same checkout, so they run one at
+# a time on a single background worker instead of on the request thread
+job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='hugo-cms-job')
+jobs = {}  # job id -> Future resolving to a (success, message) tuple
+jobs_lock = threading.RLock()
+pending_build_job = None  # Queued build that later requests can share
+pending_build_options = {}  # Arguments the queued build reads when it starts
+last_build_started = 0.0  # time.monotonic() when the latest full hugo build started
+
+# Pages saved or created through the CMS: path -> (time.monotonic() before the
+# write, os.stat() after it), so the watcher can skip builds already queued
+cms_writes = {}
+cms_writes_lock = threading.Lock()
+
+# URL path -> file in the Hugo public directory that serves it
+public_path_cache = {}
+
+# URL path (without slashes) -> source file relative to content/, as reported
+# by `hugo list all` after each build
+url_source_map = {}
+url_source_map_stale = False  # Markdown files were added, removed or moved since
+
+# Served HTML with admin controls injected: full_path -> (file stamp, bytes,
+# ETag, gzipped bytes or None), kept in least-recently-used order
+rendered_html_cache = OrderedDict()
+rendered_html_cache_lock = threading.Lock()
+
+ALLOWED_DOMAINS = frozenset(
+    domain.strip().lower()
+    for domain in os.getenv('HUGO_ALLOWED_DOMAINS', '').split(',')
+    if domain.strip()
+)
+
 @app.before_request
 def restrict_domain_access():
     """Ensure access only through approved domains"""
-    allowed_domains = os.getenv('HUGO_ALLOWED_DOMAINS', '').split(',')
-    if allowed_domains and allowed_domains[0]:  # Only check if domains are configured
-        host = request.host.lower()
-        if not any(domain.strip() for domain in allowed_domains if host == domain.strip().lower()):
-            return "Access restricted to approved domains only", 403
+    if ALLOWED_DOMAINS and request.host.lower() not in ALLOWED_DOMAINS:  # Only check if domains are configured
+        return "Access restricted to approved domains only", 403
 
 # Global configuration with environment variable defaults
 config = {
@@ -91,6 +122,19 @@ config = {
     'git_branch': os.getenv('HUGO_GIT_BRANCH', 'cms-beta'),
     'git_token': os.getenv('HUGO_GIT_TOKEN'),
     'working_dir': os.getenv('HUGO_WORKING_DIR', '/tmp/hugo-cms-work'),
+    # Shallow clone (tip commit only) instead of fetching full history
+    'git_shallow': os.getenv('HUGO_GIT_SHALLOW', '') == '1',
+    # Keep a bare mirror in the working directory that clones reference
+    'git_mirror': os.getenv('HUGO_GIT_MIRROR', '') == '1',
+    'git_dissociate': os.getenv('HUGO_GIT_DISSOCIATE', '') == '1',
+    # Partial clone filter (e.g. blob:limit=1m) and sparse checkout directories
+    'git_filter': os.getenv('HUGO_GIT_FILTER', ''),
+    'git_sparse_paths': [path.strip() for path in os.getenv('HUGO_SPARSE_PATHS', '').split(',') if path.strip()],
+    # Keep `hugo server` running for incremental rebuilds instead of full builds
+    'hugo_server_mode': os.getenv('HUGO_SERVER_MODE', '') == '1',
+    'hugo_server_port': int(os.getenv('HUGO_SERVER_PORT', '1314')),
+    # Let a front-end server (Apache mod_xsendfile, lighttpd) send static files
+    'x_sendfile': os.getenv('HUGO_X_SENDFILE', '') == '1',
     # File path validation pattern (regex)
     'file_path_pattern_regex': os.getenv('HUGO_FILE_PATH_REGEX', ''),
     'file_path_pattern_hint': os.getenv('HUGO_FILE_PATH_PATTERN_HINT', ''),
@@ -108,13 +152,127 @@ else:
     app.secret_key = secrets.token_hex(16)
     print("Warning: No FLASK_SECRET_KEY provided, using randomly generated key")
 
+# send_from_directory then answers with an X-Sendfile header instead of the
+# file body, so the front-end server copies the file to the client
+app.config['USE_X_SENDFILE'] = config['x_sendfile']
+
 class HugoRebuildHandler(FileSystemEventHandler):
-    """File system event handler to rebuild Hugo site when content changes"""
+    """File system event handler to rebuild Hugo site when content changes
+    
+    Events are debounced: editors emit several events per save and a git pull
+    touches many files at once, so a rebuild runs once the events have been
+    quiet for `debounce_delay` seconds, and at most `max_delay` seconds after
+    the first event of a burst.
+    """
+    
+    debounce_delay = 0.3
+    max_delay = 2.0
+    
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._timer = None
+        self._burst_started = None
+        self._changed_paths = set()
+    
+    def on_created(self, event):
+        clear_source_file_lookups()
+        if event.is_directory or event.src_path.endswith('.md'):
+            mark_url_source_map_stale()
+        if not event.is_directory:
+            self.content_changed(event.src_path)
+    
+    def on_deleted(self, event):
+        clear_source_file_lookups()
+        if event.is_directory or event.src_path.endswith('.md'):
+            mark_url_source_map_stale()
+        if not event.is_directory:
+            self.content_changed(event.src_path)
+    
+    def on_moved(self, event):
+        clear_source_file_lookups()
+        # Saves rename a temporary file over an existing page, which leaves
+        # the set of pages alone; only moving a page or directory changes it
+        if event.is_directory or event.src_path.endswith('.md'):
+            mark_url_source_map_stale()
+        if event.is_directory:
+            return
+        if event.dest_path.endswith('.md'):
+            # Atomic saves (ours and most editors') replace the file by rename
+            self.content_changed(event.dest_path)
+        else:
+            self.content_changed(event.src_path)
     
     def on_modified(self, event):
-        if not event.is_directory and event.src_path.endswith('.md'):
-            print(f"Content modified: {event.src_path}")
-            build_hugo_site()
+        if not event.is_directory:
+            self.content_changed(event.src_path)
+    
+    def content_changed(self, path):
+        """Rebuild after a markdown file was written, added or removed"""
+        if not path.endswith('.md'):
+            return
+        print(f"Content modified: {path}")
+        if not config['hugo_server_mode']:  # hugo server rebuilds on its own
+            self.schedule_rebuild(path)
+    
+    def schedule_rebuild(self, path):
+        """Schedule a rebuild, replacing any rebuild that is still pending"""
+        with self._lock:
+            self._changed_paths.add(path)
+            now = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+            if self._burst_started is None:
+                self._burst_started = now
+            
+            # Don't let a continuous stream of events postpone the build forever
+            delay = min(self.debounce_delay, max(0.0, self._burst_started + self.max_delay - now))
+            self._timer = threading.Timer(delay, self._rebuild)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def _rebuild(self):
+        with self._lock:
+            self._timer = None
+            self._burst_started = None
+            changed_paths = self._changed_paths
+            self._changed_paths = set()
+        # Saves and creates queue their own build right after writing; skip
+        # the duplicate when every change is one of those and already built
+        if all(built_since_cms_write(path) for path in changed_paths):
+            print("Content changes already picked up by a running or finished build")
+            return
+        submit_build_job()
+
+CMS_WRITES_SIZE = 1024
+
+def record_cms_write(path, written_at):
+    """Remember a page the CMS wrote, with time.monotonic() from before the write"""
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return
+    with cms_writes_lock:
+        if len(cms_writes) >= CMS_WRITES_SIZE:
+            cms_writes.clear()  # Forgetting a write only costs a duplicate build
+        cms_writes[os.path.normpath(path)] = (written_at, file_stat)
+
+def built_since_cms_write(path):
+    """Check whether `path` still holds what the CMS wrote and a build started after the write"""
+    with cms_writes_lock:
+        record = cms_writes.get(os.path.normpath(path))
+    if record is None:
+        return False
+    written_at, written_stat = record
+    if last_build_started <= written_at:
+        return False
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return False  # Deleted or moved away since
+    # Any later edit, in place or by rename, changes one of these
+    return ((file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size)
+            == (written_stat.st_ino, written_stat.st_mtime_ns, written_stat.st_size))
 
 def load_config(config_file='config.json'):
     """Load application configuration"""
@@ -128,25 +286,32 @@ def save_config(config_data, config_file='config.json'):
     with open(config_file, 'w') as f:
         json.dump(config_data, f, indent=2)
 
+# Site configuration files Hugo looks for in the repository root
+HUGO_CONFIG_FILES = frozenset({'config.toml', 'config.yaml', 'config.yml', 'hugo.toml', 'hugo.yaml', 'hugo.yml'})
+
 def validate_hugo_site(repo_path):
     """Validate that the given path contains a valid Hugo site"""
     if not os.path.exists(repo_path):
         return False, "Repository path does not exist"
     
-    config_files = ['config.toml', 'config.yaml', 'config.yml', 'hugo.toml', 'hugo.yaml', 'hugo.yml']
-    has_config = any(os.path.exists(os.path.join(repo_path, f)) for f in config_files)
+    # One directory listing instead of a stat per candidate file
+    with os.scandir(repo_path) as entries:
+        names = {entry.name for entry in entries}
     
-    if not has_config:
+    if HUGO_CONFIG_FILES.isdisjoint(names):
         return False, "No Hugo configuration file found"
     
-    content_dir = os.path.join(repo_path, 'content')
-    if not os.path.exists(content_dir):
+    if 'content' not in names:
         return False, "No content directory found"
     
     return True, "Valid Hugo site"
 
-def start_file_watcher():
-    """Start the file watcher for content changes"""
+def start_file_watcher(build=True):
+    """Start the file watcher for content changes
+    
+    In server mode this also builds the site to start hugo server, unless
+    build is False; the first build started later starts it instead.
+    """
     global file_observer
     
     # Stop existing watcher first
@@ -161,12 +326,101 @@ def start_file_watcher():
         if os.path.exists(content_dir):
             event_handler = HugoRebuildHandler()
             file_observer = Observer()
+            # One recursive watch: the inotify backend opens an inotify
+            # instance per schedule() call, and those are limited per user
             file_observer.schedule(event_handler, content_dir, recursive=True)
             file_observer.start()
             print(f"Started file watcher on {content_dir}")
+            if build and config['hugo_server_mode'] and (hugo_server_process is None or hugo_server_process.poll() is not None):
+                build_hugo_site()  # Starts hugo server since it isn't running yet
             return True
     return False
 
+def start_hugo_server():
+    """Start a long-running `hugo server` that re-renders changed pages to disk"""
+    global hugo_server_process
+    stop_hugo_server()
+    hugo_server_process = subprocess.Popen([
+        'hugo', 'server',
+        '--renderToDisk',
+        '--watch',
+        '--disableLiveReload',
+        '--bind', '127.0.0.1',
+        '--port', str(config['hugo_server_port']),
+        # Keep links root-relative instead of pointing at the internal port
+        '--baseURL', '/',
+        '--appendPort=false',
+    ], cwd=config['hugo_repo_path'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    threading.Thread(target=follow_hugo_server_output, args=(hugo_server_process,), daemon=True).start()
+    print(f"Started hugo server (pid {hugo_server_process.pid})")
+
+# hugo server ends each (re)build with a "Total in 12 ms" line ("Built in" on
+# newer releases)
+HUGO_RENDER_DONE_PREFIXES = ('Total in', 'Built in')
+
+def follow_hugo_server_output(process):
+    """Echo hugo server's output and count the renders it finishes"""
+    global hugo_server_renders
+    for line in process.stdout:
+        print(line, end='')
+        if line.startswith(HUGO_RENDER_DONE_PREFIXES):
+            with hugo_server_render_cond:
+                hugo_server_renders += 1
+                hugo_server_render_cond.notify_all()
+
+def hugo_server_render_count():
+    """Return how many renders hugo server has reported finishing so far"""
+    with hugo_server_render_cond:
+        return hugo_server_renders
+
+def wait_for_hugo_server_render(seen, timeout):
+    """Wait for hugo server to finish a render after the first `seen`, returning False on timeout"""
+    with hugo_server_render_cond:
+        return hugo_server_render_cond.wait_for(lambda: hugo_server_renders > seen, timeout)
+
+def stop_hugo_server():
+    """Stop the `hugo server` process if one is running"""
+    global hugo_server_process
+    if hugo_server_process is not None:
+        hugo_server_process.terminate()
+        try:
+            hugo_server_process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            hugo_server_process.kill()
+        hugo_server_process = None
+        print("Stopped hugo server")
+
+# Don't leave an orphaned hugo server behind when the CMS exits
+atexit.register(stop_hugo_server)
+
+def handle_rmtree_error(func, path, exc_info):
+    """Make read-only files (e.g. git pack files) writable and retry the removal"""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+def remove_tree_contents(path):
+    """Delete everything inside a directory, leaving the directory itself"""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, onerror=handle_rmtree_error)
+            else:
+                os.remove(entry.path)
+
+# Old clones are renamed to this prefix in the working dir and deleted later
+DELETED_REPO_PREFIX = 'repo.deleted-'
+
+def remove_deleted_repos(working_dir):
+    """Delete clones set aside by clear_cached_repo, including leftovers from earlier runs"""
+    for entry in os.scandir(working_dir):
+        if entry.name.startswith(DELETED_REPO_PREFIX) and entry.is_dir(follow_symlinks=False):
+            try:
+                shutil.rmtree(entry.path, onerror=handle_rmtree_error)
+                print(f"Deleted old repository at {entry.path}")
+            except OSError as e:
+                # Another clear may be deleting the same tree; retried next time
+                print(f"Error deleting old repository at {entry.path}: {e}")
+
 def clear_cached_repo():
     """Clear the cached repository clone"""
     global file_observer
@@ -182,53 +436,84 @@ def clear_cached_repo():
         else:
             print("No file watcher to stop")
         
+        stop_hugo_server()
+        
         working_dir = config['working_dir']
         repo_dir = os.path.join(working_dir, 'repo')
         
         if os.path.exists(repo_dir):
             print(f"Removing repository contents from {repo_dir}...")
+            # Renaming is instant, so the re-clone can start right away while
+            # the old tree (and its .git objects) is deleted in the background
+            deleted_dir = os.path.join(working_dir, f'{DELETED_REPO_PREFIX}{uuid.uuid4().hex}')
             try:
-                # Remove the repo directory contents instead of the whole working_dir
-                shutil.rmtree(repo_dir)
-                print(f"Cleared repository at {repo_dir}")
-                
-                # Reset config to clean state
-                config['hugo_repo_path'] = None
-                config['hugo_site_built'] = False
-                config['hugo_public_dir'] = None
-                
-                return True, "Repository cache cleared"
-            except OSError as e:
-                if "Device or resource busy" in str(e):
-                    # If still busy, try removing individual items
-                    print("Directory busy, trying to clear individual items...")
-                    try:
-                        for item in os.listdir(repo_dir):
-                            item_path = os.path.join(repo_dir, item)
-                            if os.path.isdir(item_path):
-                                shutil.rmtree(item_path)
-                            else:
-                                os.remove(item_path)
-                        print(f"Cleared repository contents from {repo_dir}")
-                        return True, "Repository cache cleared (individual items)"
-                    except Exception as e2:
-                        return False, f"Failed to clear cache: {str(e2)}"
-                else:
-                    raise e
+                os.rename(repo_dir, deleted_dir)
+            except OSError:
+                # e.g. a mount point or busy directory that can't be moved or
+                # removed itself, or files held open on Windows; empty it in place
+                remove_tree_contents(repo_dir)
+            threading.Thread(target=remove_deleted_repos, args=(working_dir,), daemon=True).start()
+            print(f"Cleared repository at {repo_dir}")
+            
+            # Reset config to clean state
+            url_source_map.clear()
+            clear_source_file_lookups()
+            config['hugo_repo_path'] = None
+            config['hugo_site_built'] = False
+            config['hugo_public_dir'] = None
+            
+            return True, "Repository cache cleared"
         
         return True, "No cached repository to clear"
     except Exception as e:
         return False, f"Error clearing repository cache: {str(e)}"
 
+# Seconds before a stalled git command (usually a clone, fetch or push to an
+# unresponsive remote) is killed so it can't wedge the job worker
+GIT_COMMAND_TIMEOUT = 600
+
+# Fail instead of waiting forever for credentials on a terminal nobody watches
+GIT_ENV = {**os.environ, 'GIT_TERMINAL_PROMPT': '0'}
+
+def run_git(*args, cwd=None, check=True):
+    """Run a git command and return the completed process"""
+    try:
+        result = subprocess.run([GIT_EXECUTABLE, *args], cwd=cwd, capture_output=True, text=True,
+                                env=GIT_ENV, timeout=GIT_COMMAND_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"git {args[0]} timed out after {GIT_COMMAND_TIMEOUT} seconds")
+    if check and result.returncode != 0:
+        output = result.stderr.strip() or result.stdout.strip()
+        raise RuntimeError(f"git command failed (return code {result.returncode}): {output}")
+    return result
+
+def commit_identity_options(repo_dir):
+    """Get `-c` options supplying a commit identity when git has none configured"""
+    if run_git('config', 'user.email', cwd=repo_dir, check=False).stdout.strip():
+        return []
+    
+    # Same fallback GitPython used: local user name at this host
+    user = getpass.getuser()
+    return ['-c', f'user.name={user}', '-c', f'user.email={user}@{socket.gethostname()}']
+
+def update_clone_mirror(clone_url, mirror_dir):
+    """Create or refresh the bare mirror used as a clone reference"""
+    if os.path.exists(os.path.join(mirror_dir, 'HEAD')):
+        run_git('fetch', '--prune', 'origin', cwd=mirror_dir)
+        print(f"Updated clone mirror at {mirror_dir}")
+    else:
+        if os.path.exists(mirror_dir):
+            shutil.rmtree(mirror_dir)  # Remove any incomplete mirror
+        run_git('clone', '--mirror', clone_url, mirror_dir)
+        print(f"Created clone mirror at {mirror_dir}")
+
 def setup_git_repo():
     """Clone or update the Git repository"""
     if not config['git_repo_url']:
         return False, "No Git repository URL configured"
     
-    # Initialize git module
-    git, git_error = init_git()
-    if not git:
-        return False, f"Git not available: {git_error}"
+    if not GIT_EXECUTABLE:
+        return False, "Git not available: git executable not found on PATH"
     
     try:
         working_dir = config['working_dir']
@@ -239,14 +524,14 @@ def setup_git_repo():
         
         # If repo already exists, pull latest changes
         if os.path.exists(repo_dir) and os.path.exists(os.path.join(repo_dir, '.git')):
-            repo = git.Repo(repo_dir)
-            origin = repo.remotes.origin
-            origin.pull(config['git_branch'])
+            run_git('pull', 'origin', config['git_branch'], cwd=repo_dir)
             print(f"Pulled latest changes from {config['git_branch']} branch")
         else:
             # Clone the repository
             if os.path.exists(repo_dir):
-                shutil.rmtree(repo_dir)  # Remove any existing non-git directory
+                # Remove any existing non-git files; git clones into an empty
+                # directory, which may be a mount point that can't be removed
+                remove_tree_contents(repo_dir)
             
             # Prepare clone URL with authentication token
             clone_url = config['git_repo_url']
@@ -254,11 +539,41 @@ def setup_git_repo():
                 # Insert token for GitHub authentication
                 clone_url = clone_url.replace('https://github.com/', f'https://{config["git_token"]}@github.com/')
             
-            repo = git.Repo.clone_from(clone_url, repo_dir, branch=config['git_branch'])
+            clone_options = ['--branch', config['git_branch']]
+            if config['git_shallow']:
+                # Only fetch the tip of the configured branch; later pulls in a
+                # shallow clone transfer just the commits made since then
+                clone_options += ['--depth=1', '--single-branch', '--no-tags']
+            
+            if config['git_filter']:
+                # Partial clone: blobs outside the filter are fetched on demand
+                clone_options += ['--filter', config['git_filter']]
+            
+            if config['git_sparse_paths']:
+                # Start with only top-level files checked out
+                clone_options.append('--sparse')
+            
+            if config['git_mirror']:
+                # Borrow objects from the local mirror so only new objects
+                # are transferred from the remote
+                mirror_dir = os.path.join(working_dir, 'mirror.git')
+                update_clone_mirror(clone_url, mirror_dir)
+                clone_options += ['--reference', mirror_dir]
+                if config['git_dissociate']:
+                    clone_options.append('--dissociate')
+            
+            run_git('clone', *clone_options, clone_url, repo_dir)
+            if config['git_sparse_paths']:
+                run_git('sparse-checkout', 'set', '--cone', *config['git_sparse_paths'], cwd=repo_dir)
             print(f"Cloned repository from {config['git_repo_url']}")
         
+        # Let git status remember untracked-file scans in the index, so the
+        # clean-tree check on publish only re-reads directories that changed
+        run_git('config', 'core.untrackedCache', 'true', cwd=repo_dir)
+        
         # Update hugo_repo_path to point to our working directory
         config['hugo_repo_path'] = repo_dir
+        clear_source_file_lookups()  # The pull or clone may have added or removed pages
         
         # Validate it's a Hugo site
         valid, message = validate_hugo_site(repo_dir)
@@ -270,61 +585,115 @@ def setup_git_repo():
     except Exception as e:
         return False, f"Git setup error: {str(e)}"
 
-def commit_and_push_changes(commit_message="Update content via CMS"):
+def commit_and_push_changes(commit_message="Update content via CMS", client_ip='unknown'):
     """Commit local changes and push to remote repository"""
     if not config['hugo_repo_path'] or not os.path.exists(config['hugo_repo_path']):
         return False, "No working directory found"
     
-    # Initialize git module
-    git, git_error = init_git()
-    if not git:
-        return False, f"Git not available: {git_error}"
+    if not GIT_EXECUTABLE:
+        return False, "Git not available: git executable not found on PATH"
     
     try:
-        repo = git.Repo(config['hugo_repo_path'])
+        repo_dir = config['hugo_repo_path']
         
-        # Check if there are any changes to commit
-        if not repo.is_dirty(untracked_files=True):
+        # A single porcelain status covers tracked and untracked changes, so
+        # a clean tree costs one git process and never rewrites the index
+        if not run_git('status', '--porcelain', cwd=repo_dir).stdout.strip():
             return True, "No changes to commit"
         
-        # Add all changes
-        repo.git.add('.')
-        
-        # Commit changes
-        repo.index.commit(commit_message)
+        # Stage and commit changes
+        run_git('add', '-A', cwd=repo_dir)
+        run_git(*commit_identity_options(repo_dir), 'commit', '-m', commit_message, cwd=repo_dir)
         
         # Push to remote
-        origin = repo.remotes.origin
-        origin.push(config['git_branch'])
+        run_git('push', 'origin', config['git_branch'], cwd=repo_dir)
         
         # Log security event
-        client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR', 'unknown'))
-        security_logger.info(f"GIT_PUSH - Changes pushed to {config['git_branch']} branch from IP: {client_ip}")
+        security_logger.info("GIT_PUSH - Changes pushed to %s branch from IP: %s", config['git_branch'], client_ip)
         
         return True, "Changes committed and pushed successfully"
         
     except Exception as e:
         return False, f"Git commit/push error: {str(e)}"
 
-def build_hugo_site():
-    """Build the Hugo site"""
+# Seconds a build in server mode waits for hugo server to finish re-rendering
+HUGO_SERVER_RENDER_WAIT = 2.0
+
+# Seconds before a hung hugo build is killed so it can't wedge the job worker
+HUGO_BUILD_TIMEOUT = 300
+
+def mark_url_source_map_stale():
+    """Have the next build re-list pages, even when hugo server handled it"""
+    global url_source_map_stale
+    url_source_map_stale = True
+
+def refresh_url_source_map():
+    """Ask Hugo which source file each page URL is built from"""
+    global url_source_map, url_source_map_stale
+    url_source_map_stale = False  # Changes from here on need another listing
+    try:
+        result = subprocess.run(['hugo', 'list', 'all'], cwd=config['hugo_repo_path'],
+                                capture_output=True, text=True, timeout=HUGO_BUILD_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Could not list Hugo pages: {e}")
+        return
+    if result.returncode != 0:
+        # Older Hugo releases lack `list all`; URL lookups fall back to guessing
+        print(f"Could not list Hugo pages: {result.stderr.strip()}")
+        return
+    
+    # CSV with a header row; path is relative to the site root (content/...)
+    # and permalink includes the baseURL
+    source_map = {}
+    for row in csv.DictReader(io.StringIO(result.stdout)):
+        path = (row.get('path') or '').replace('\\', '/')
+        if not path.endswith('.md'):
+            continue
+        if path.startswith('content/'):
+            path = path[len('content/'):]
+        url_path = unquote(urlparse(row.get('permalink') or '').path).strip('/') or 'index'
+        source_map.setdefault(url_path, path)
+    
+    url_source_map = source_map
+    find_source_file_for_url.cache_clear()
+
+def build_hugo_site(render_baseline=None):
+    """Build the Hugo site
+    
+    render_baseline is hugo_server_render_count() from before the change that
+    queued this build was written; in server mode the build waits for a
+    render past it instead of running hugo.
+    """
     if not config['hugo_repo_path']:
         return False, "No Hugo repository path configured"
     
     if not os.path.exists(config['hugo_repo_path']):
         return False, f"Hugo repository path does not exist: {config['hugo_repo_path']}"
     
-    original_cwd = os.getcwd()
-    
+    # In server mode a running hugo server keeps public/ up to date by itself;
+    # give it a moment to pick up the change that queued this build
+    if config['hugo_server_mode'] and hugo_server_process is not None:
+        if hugo_server_process.poll() is None:
+            rendered = False
+            if render_baseline is not None:
+                rendered = wait_for_hugo_server_render(render_baseline, HUGO_SERVER_RENDER_WAIT)
+            # Listing pages costs a whole `hugo list all`, so skip it for
+            # plain edits that leave the set of pages unchanged
+            if url_source_map_stale:
+                refresh_url_source_map()
+            prune_gzip_cache()  # Full builds prune via clear_public_caches
+            if rendered:
+                return True, "Hugo server re-rendered the site"
+            return True, "Hugo server is running"
+        print(f"Hugo server exited (return code {hugo_server_process.returncode}), restarting")
+    
+    global last_build_started
     try:
-        # Change to Hugo site directory
-        os.chdir(config['hugo_repo_path'])
-        
-        # Run Hugo build command
-        result = subprocess.run(['hugo'], capture_output=True, text=True)
-        
-        # Restore original directory
-        os.chdir(original_cwd)
+        last_build_started = time.monotonic()
+        # Run Hugo build command in the site directory; cwd= only affects the
+        # child process, unlike os.chdir which would race other request threads
+        result = subprocess.run(['hugo', '--quiet'], cwd=config['hugo_repo_path'],
+                                capture_output=True, text=True, timeout=HUGO_BUILD_TIMEOUT)
         
         if result.returncode != 0:
             error_msg = f"Hugo build failed (return code {result.returncode})\nSTDOUT: {result.stdout}\nSTDERR: {result.stderr}"
@@ -334,18 +703,136 @@ def build_hugo_site():
         # Set public directory path
         config['hugo_public_dir'] = os.path.join(config['hugo_repo_path'], 'public')
         config['hugo_site_built'] = True
+        clear_public_caches()  # Drop pages the build may have removed
+        refresh_url_source_map()
+        
+        # After the initial full build, hand incremental rebuilds to hugo server
+        if config['hugo_server_mode']:
+            start_hugo_server()
         
         print("Hugo site built successfully")
         return True, "Hugo site built successfully"
         
     except Exception as e:
-        # Restore original directory
-        try:
-            os.chdir(original_cwd)
-        except:
-            pass
         return False, f"Build error: {str(e)}"
 
+MAX_FINISHED_JOBS = 100
+
+def submit_job(func, *args):
+    """Queue func on the background worker and return the job id"""
+    job_id = uuid.uuid4().hex
+    with jobs_lock:
+        # Forget the oldest finished jobs so the table doesn't grow forever
+        finished = [old_id for old_id, future in jobs.items() if future.done()]
+        for old_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del jobs[old_id]
+        jobs[job_id] = job_executor.submit(func, *args)
+    return job_id
+
+def run_build_job(options):
+    """Run a queued build with the options requests sharing it left behind"""
+    with jobs_lock:
+        render_baseline = options.get('render_baseline')
+    return build_hugo_site(render_baseline)
+
+def submit_build_job(render_baseline=None):
+    """Queue a site build, sharing a build that is queued but not started yet
+    
+    Pass hugo_server_render_count() from before writing the change, so that
+    in server mode the build waits for the render that includes it.
+    """
+    global pending_build_job, pending_build_options
+    with jobs_lock:
+        future = jobs.get(pending_build_job)
+        # A build that hasn't started will still pick up every change on disk
+        if future is None or future.running() or future.done():
+            pending_build_options = {'render_baseline': render_baseline}
+            pending_build_job = submit_job(run_build_job, pending_build_options)
+        elif render_baseline is not None:
+            # Wait for the render covering the latest of the shared changes
+            shared_baseline = pending_build_options.get('render_baseline')
+            if shared_baseline is None or render_baseline > shared_baseline:
+                pending_build_options['render_baseline'] = render_baseline
+        return pending_build_job
+
+def get_job_status(job_id):
+    """Return a JSON-ready status dict for a job, or None if it is unknown"""
+    with jobs_lock:
+        future = jobs.get(job_id)
+    if future is None:
+        return None
+    
+    if not future.done():
+        status = 'running' if future.running() else 'queued'
+        return {'success': True, 'status': status, 'message': f'Job {status}'}
+    
+    try:
+        success, message = future.result()
+    except Exception as e:
+        success, message = False, f"Job error: {str(e)}"
+    return {'success': success, 'status': 'done', 'message': message}
+
+def remote_branch_matches_head():
+    """Check whether origin's branch still points at the local HEAD"""
+    repo_dir = config['hugo_repo_path']
+    if not repo_dir or not GIT_EXECUTABLE:
+        return False
+    
+    try:
+        remote_ref = run_git('ls-remote', 'origin', f"refs/heads/{config['git_branch']}", cwd=repo_dir).stdout.split()
+        head = run_git('rev-parse', 'HEAD', cwd=repo_dir).stdout.strip()
+    except Exception:
+        return False  # Fall back to pulling
+    
+    return bool(remote_ref) and remote_ref[0] == head
+
+def publish_changes(client_ip):
+    """Pull remote changes, then commit and push local ones"""
+    # First, pull any remote changes to avoid conflicts. ls-remote only
+    # transfers one ref, so it's a cheap way to skip a pull with nothing to fetch
+    if not remote_branch_matches_head():
+        pull_success, pull_message = setup_git_repo()
+        if not pull_success:
+            return False, f'Failed to pull latest changes: {pull_message}'
+    
+    # Commit and push local changes
+    return commit_and_push_changes(client_ip=client_ip)
+
+def refresh_cached_repo(rebuild=True):
+    """Clear the cached clone, re-clone it and optionally rebuild the site"""
+    try:
+        # Clear the cached repository (this also resets config)
+        clear_success, clear_message = clear_cached_repo()
+        if not clear_success:
+            return False, clear_message
+        
+        # Re-setup the repository
+        setup_success, setup_message = setup_git_repo()
+        if not setup_success:
+            return False, f'Cache cleared but failed to re-clone: {setup_message}'
+        
+        # Rebuild the site after re-cloning; without it the first page request
+        # builds the site
+        if rebuild:
+            build_success, build_message = build_hugo_site()
+            if not build_success:
+                return False, f'Re-cloned successfully but build failed: {build_message}'
+        
+        # Restart the file watcher, leaving hugo server stopped until the
+        # first build if no rebuild was asked for
+        start_file_watcher(build=rebuild)
+        
+        if not rebuild:
+            return True, 'Repository cache cleared and re-cloned'
+        return True, 'Repository cache cleared, re-cloned, and rebuilt successfully'
+    
+    except Exception as e:
+        return False, f'Cache clear error: {str(e)}'
+
+def clear_source_file_lookups():
+    """Forget cached URL to source file lookups"""
+    find_source_file_for_url.cache_clear()
+
 def get_content_files():
     """Get all markdown content files from Hugo site"""
     if not config['hugo_repo_path']:
@@ -356,19 +843,23 @@ def get_content_files():
         return []
     
     content_files = []
-    for root, dirs, files in os.walk(content_dir):
-        for file in files:
-            if file.endswith('.md'):
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, content_dir)
-                content_files.append({
-                    'path': file_path,
-                    'relative_path': rel_path,
-                    'name': file
-                })
+    pending_dirs = [content_dir]
+    while pending_dirs:
+        with os.scandir(pending_dirs.pop()) as entries:
+            for entry in entries:
+                # Like os.walk, don't descend into symlinked directories
+                if entry.is_dir(follow_symlinks=False):
+                    pending_dirs.append(entry.path)
+                elif entry.name.endswith('.md') and entry.is_file():
+                    content_files.append({
+                        'path': entry.path,
+                        'relative_path': os.path.relpath(entry.path, content_dir),
+                        'name': entry.name
+                    })
     
     return content_files
 
+@lru_cache(maxsize=1024)
 def find_source_file_for_url(url_path):
     """Find the markdown source file that corresponds to a Hugo URL"""
     content_dir = os.path.join(config['hugo_repo_path'], 'content')
@@ -378,14 +869,20 @@ def find_source_file_for_url(url_path):
     if not url_path:
         url_path = 'index'
     
+    # Hugo's own URL to file mapping from the last build covers custom slugs
+    # and permalinks; pages it doesn't know yet (e.g. just created) are guessed
+    source_file = url_source_map.get(url_path)
+    if source_file:
+        return source_file
+    
     # Common patterns Hugo uses for URL to file mapping
-    possible_files = [
+    possible_files = (
         f"{url_path}.md",
         f"{url_path}/index.md",
         f"{url_path}/_index.md",
         f"posts/{url_path}.md",
         f"blog/{url_path}.md",
-    ]
+    )
     
     for possible_file in possible_files:
         full_path = os.path.join(content_dir, possible_file)
@@ -394,50 +891,43 @@ def find_source_file_for_url(url_path):
     
     return None
 
+# Top-level "key: value" frontmatter line: (key, spacing after colon, value)
+FRONTMATTER_LINE_RE = re.compile(r'^([^:\s][^:]*?)\s*:(\s*)(.*)$')
+
 def preserve_frontmatter_format(file_path, new_frontmatter, new_content):
     """Preserve the original frontmatter formatting when updating a file"""
     try:
-        # Read the original file to understand its formatting
-        with open(file_path, 'r', encoding='utf-8', newline='') as f:
-            original_content = f.read()
+        # Read the original file once to understand its formatting
+        with open(file_path, 'rb') as f:
+            original_content = f.read().decode('utf-8')
         
         # Normalize line endings in new content to match original (Unix LF)
         new_content = new_content.replace('\r\n', '\n').replace('\r', '\n')
         
-        # Parse the original file to get its structure
-        original_post = frontmatter.load(file_path)
-        
         # Split the original content to analyze frontmatter formatting
         if original_content.startswith('---\n'):
             parts = original_content.split('---\n', 2)
             if len(parts) >= 3:
                 original_fm_raw = parts[1]
-                original_body = parts[2] if len(parts) > 2 else ''
+                
+                # Parse just the frontmatter block to learn its top-level keys
+                # (and make sure it is valid YAML before editing it line by line)
+                original_metadata = yaml.safe_load(original_fm_raw) or {}
+                if not isinstance(original_metadata, dict):
+                    raise ValueError("Frontmatter is not a mapping")
                 
                 # Build new frontmatter while preserving formatting patterns
                 new_fm_lines = []
                 
-                # Create a mapping of original values for comparison
-                original_values = {}
-                for line in original_fm_raw.split('\n'):
-                    if ':' in line:
-                        key = line.split(':', 1)[0].strip()
-                        value_part = line.split(':', 1)[1]
-                        original_values[key] = value_part
-                
                 # Process each line of original frontmatter to preserve style
                 for line in original_fm_raw.split('\n'):
-                    if ':' in line:
-                        key = line.split(':', 1)[0].strip()
+                    match = FRONTMATTER_LINE_RE.match(line)
+                    if match:
+                        key, original_spacing, original_value = match.groups()
                         if key in new_frontmatter:
                             # Get the original formatting style (quotes, spacing, etc.)
-                            original_value_part = line.split(':', 1)[1]
-                            has_quotes = '"' in original_value_part
-                            # Extract original spacing after colon
-                            if original_value_part.lstrip():
-                                first_char = original_value_part.lstrip()[0]
-                                original_spacing = original_value_part[:original_value_part.find(first_char)]
-                            else:
+                            has_quotes = '"' in original_value
+                            if not original_value:
                                 original_spacing = ' '
                             
                             # For fields that might get auto-converted (like dates), 
@@ -445,8 +935,8 @@ def preserve_frontmatter_format(file_path, new_frontmatter, new_content):
                             new_value = str(new_frontmatter[key])
                             
                             # Special handling for date fields to prevent auto-conversion
-                            if key == 'date' and key in original_post.metadata:
-                                original_date_value = original_value_part.strip().strip('"')
+                            if key == 'date' and key in original_metadata:
+                                original_date_value = original_value.strip().strip('"')
                                 # If the original was a simple date and new value is a verbose date,
                                 # keep the original format
                                 if len(original_date_value) <= 10 and 'GMT' in new_value:
@@ -461,14 +951,14 @@ def preserve_frontmatter_format(file_path, new_frontmatter, new_content):
                             new_fm_lines.append(f'{key}:{original_spacing}{new_value}')
                         else:
                             new_fm_lines.append(line)
-                    elif line.strip():  # Only include non-empty lines (comments, etc.)
+                    elif line.strip():  # Only include non-empty lines (comments, nested values, etc.)
                         new_fm_lines.append(line)
                     # Skip completely empty lines in frontmatter
                 
                 # Add any new frontmatter keys that weren't in the original
-                original_keys = set(original_post.metadata.keys())
-                new_keys = set(new_frontmatter.keys())
-                for key in new_keys - original_keys:
+                for key in new_frontmatter:
+                    if key in original_metadata:
+                        continue
                     value = str(new_frontmatter[key])
                     # Default to quoted format for strings
                     if isinstance(new_frontmatter[key], str) and not value.isdigit():
@@ -483,8 +973,10 @@ def preserve_frontmatter_format(file_path, new_frontmatter, new_content):
                 if not original_content.endswith('\n'):
                     result = result.rstrip('\n')
                 
-                # Ensure all line endings are Unix LF
-                result = result.replace('\r\n', '\n').replace('\r', '\n')
+                # Ensure all line endings are Unix LF; new_content is already
+                # normalized, so this only copies when the frontmatter has a CR
+                if '\r' in result:
+                    result = result.replace('\r\n', '\n').replace('\r', '\n')
                 
                 return result
         
@@ -497,37 +989,56 @@ def preserve_frontmatter_format(file_path, new_frontmatter, new_content):
         post = frontmatter.Post(new_content, **new_frontmatter)
         return frontmatter.dumps(post)
 
+def load_template(name):
+    """Read and compile a template from static/templates"""
+    with open(os.path.join('static', 'templates', name), 'r', encoding='utf-8') as f:
+        return Template(f.read())
+
+# MIME types for the files Hugo sites serve most; anything else is looked up
+# in the system MIME database
+CONTENT_TYPES = {
+    '.html': 'text/html',
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.json': 'application/json',
+    '.xml': 'application/xml',
+    '.txt': 'text/plain',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.svg': 'image/svg+xml',
+    '.ico': 'image/x-icon',
+    '.woff': 'font/woff',
+    '.woff2': 'font/woff2',
+    '.ttf': 'font/ttf',
+    '.otf': 'font/otf',
+    '.eot': 'application/vnd.ms-fontobject',
+    '.pdf': 'application/pdf',
+    '.zip': 'application/zip',
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+}
+
 def get_content_type(file_path):
     """Get the appropriate MIME type for a file based on its extension"""
-    extension = os.path.splitext(file_path)[1].lower()
-    
-    content_types = {
-        '.html': 'text/html',
-        '.css': 'text/css',
-        '.js': 'application/javascript',
-        '.json': 'application/json',
-        '.xml': 'application/xml',
-        '.txt': 'text/plain',
-        '.png': 'image/png',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.gif': 'image/gif',
-        '.svg': 'image/svg+xml',
-        '.ico': 'image/x-icon',
-        '.woff': 'font/woff',
-        '.woff2': 'font/woff2',
-        '.ttf': 'font/ttf',
-        '.otf': 'font/otf',
-        '.eot': 'application/vnd.ms-fontobject',
-        '.pdf': 'application/pdf',
-        '.zip': 'application/zip',
-        '.mp4': 'video/mp4',
-        '.webm': 'video/webm',
-        '.mp3': 'audio/mpeg',
-        '.wav': 'audio/wav',
-    }
-    
-    return content_types.get(extension, 'application/octet-stream')
+    return content_type_for_extension(os.path.splitext(file_path)[1].lower())
+
+@lru_cache(maxsize=256)
+def content_type_for_extension(extension):
+    """MIME type for a lowercase file extension such as '.css'"""
+    content_type = CONTENT_TYPES.get(extension)
+    if content_type:
+        return content_type
+    
+    # Compressed files (.svgz, .gz) are sent as-is, without a
+    # Content-Encoding, so they stay opaque downloads
+    content_type, encoding = mimetypes.guess_type(f'file{extension}')
+    if content_type and not encoding:
+        return content_type
+    return 'application/octet-stream'
 
 def is_password_required():
     """Check if password protection is enabled"""
@@ -576,67 +1087,83 @@ def validate_file_path(file_path):
     except re.error as e:
         return False, f'Invalid file path pattern configured: {str(e)}'
 
-def is_binary_file(file_path):
-    """Check if a file should be treated as binary"""
-    # Check if it's a directory first
-    if os.path.isdir(file_path):
-        return False  # Directories are not binary files
-    
-    extension = os.path.splitext(file_path)[1].lower()
-    
-    text_extensions = {'.html', '.css', '.js', '.json', '.xml', '.txt', '.svg', '.md'}
-    binary_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.ico', '.woff', '.woff2', 
-                        '.ttf', '.otf', '.eot', '.pdf', '.zip', '.mp4', '.webm', '.mp3', '.wav'}
-    
-    if extension in text_extensions:
-        return False
-    elif extension in binary_extensions:
-        return True
-    else:
-        # For unknown extensions, try to detect if it's binary
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                f.read(1024)  # Try to read first 1KB as text
-            return False
-        except (UnicodeDecodeError, UnicodeError, IsADirectoryError):
-            return True
+# Case-insensitive fallbacks for the closing tags admin assets are injected before
+HEAD_CLOSE_RE = re.compile(rb'</head>', re.IGNORECASE)
+BODY_CLOSE_RE = re.compile(rb'</body>', re.IGNORECASE)
 
-def inject_admin_controls(html_content, source_file=None):
-    """Inject admin controls into HTML content using external files"""
-    try:
-        # Load admin controls template
-        with open('static/templates/admin_controls.html', 'r', encoding='utf-8') as f:
-            admin_controls_template = Template(f.read())
-        
-        # Render the admin controls with context
-        admin_controls = admin_controls_template.render(
-            source_file=source_file,
-            password_required=is_password_required()
-        )
-        
-        # Create CSS link tag
-        admin_css = '<link rel="stylesheet" href="/admin/static/css/admin.css">'
-        
-        # Create JavaScript configuration and script tags
-        config_js = f'''
+def admin_asset_url(path):
+    """URL for an admin asset, versioned by mtime so browsers can cache it indefinitely"""
+    version = int(os.stat(os.path.join('static', path)).st_mtime)
+    return f'/admin/static/{path}?v={version}'
+
+# Admin assets injected into every served page, loaded once at startup
+ADMIN_CONTROLS_TEMPLATE = load_template('admin_controls.html')
+ADMIN_CSS_TAG = f'<link rel="stylesheet" href="{admin_asset_url("css/admin.css")}">'.encode('utf-8')
+ADMIN_JS_TAG = f'<script src="{admin_asset_url("js/admin.js")}"></script>'.encode('utf-8')
+
+@lru_cache(maxsize=2048)
+def render_admin_snippet(source_file, password_required, file_path_pattern, file_path_pattern_hint):
+    """Render the admin controls and config script injected before </body>"""
+    # Render the admin controls with context
+    admin_controls = ADMIN_CONTROLS_TEMPLATE.render(
+        source_file=source_file,
+        password_required=password_required
+    )
+    
+    # Create JavaScript configuration. JSON keeps quotes and regex backslashes
+    # intact, and escaping "<" stops a value from closing the script element
+    config_json = json.dumps({
+        'currentSourceFile': source_file or '',
+        'filePathPattern': file_path_pattern,
+        'filePathPatternHint': file_path_pattern_hint
+    }, indent=4).replace('<', '\\u003c')
+    config_js = f'''
 <script>
 // Hugo CMS Configuration
-window.hugoCmsConfig = {{
-    currentSourceFile: '{source_file or ''}',
-    filePathPattern: '{config.get('file_path_pattern_regex', '')}',
-    filePathPatternHint: '{config.get('file_path_pattern_hint', '')}'
-}};
+window.hugoCmsConfig = {config_json};
 </script>
 '''
-        admin_js = '<script src="/admin/static/js/admin.js"></script>'
-        
-        # Inject CSS in head
-        html_content = re.sub(r'</head>', admin_css + '</head>', html_content, flags=re.IGNORECASE)
-        
-        # Inject admin controls, config, and JS before closing body tag
-        html_content = re.sub(r'</body>', admin_controls + config_js + admin_js + '</body>', html_content, flags=re.IGNORECASE)
+    
+    return (admin_controls + config_js).encode('utf-8') + ADMIN_JS_TAG
+
+def inject_admin_controls(html_content, source_file=None):
+    """Inject admin controls into raw HTML bytes using external files"""
+    try:
+        # The snippet only varies with these inputs, so it's rendered once per
+        # combination rather than on every page
+        admin_snippet = render_admin_snippet(
+            source_file,
+            is_password_required(),
+            config.get('file_path_pattern_regex', ''),
+            config.get('file_path_pattern_hint', '')
+        )
         
-        return html_content
+        # Hugo emits lowercase tags, so try a plain bytes search before
+        # falling back to a case-insensitive regex
+        head_idx = html_content.find(b'</head>')
+        if head_idx == -1:
+            match = HEAD_CLOSE_RE.search(html_content)
+            head_idx = match.start() if match else -1
+        body_idx = html_content.rfind(b'</body>')
+        if body_idx == -1:
+            matches = list(BODY_CLOSE_RE.finditer(html_content))
+            body_idx = matches[-1].start() if matches else -1
+        
+        # Splice CSS in head and admin controls, config, and JS before
+        # closing body tag in a single pass; memoryview slices let the join
+        # copy the page once instead of slicing it into new bytes first
+        page = memoryview(html_content)
+        parts = []
+        start = 0
+        if head_idx != -1:
+            parts += [page[:head_idx], ADMIN_CSS_TAG]
+            start = head_idx
+        if body_idx >= start:
+            parts += [page[start:body_idx], admin_snippet]
+            start = body_idx
+        parts.append(page[start:])
+        
+        return b''.join(parts)
         
     except Exception as e:
         print(f"Error injecting admin controls: {e}")
@@ -644,6 +1171,9 @@ window.hugoCmsConfig = {{
     
     return html_content
 
+# Login page, compiled once at startup
+LOGIN_TEMPLATE = load_template('login.html')
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if not is_password_required():
@@ -659,17 +1189,13 @@ def login():
         if check_password(password):
             session['authenticated'] = True
             # Security log
-            client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR', 'unknown'))
-            security_logger.info(f"SUCCESSFUL_LOGIN from IP: {client_ip}")
+            security_logger.info("SUCCESSFUL_LOGIN from IP: %s", get_client_ip())
             return redirect(next_url or url_for('index'))
         else:
             error = 'Invalid password'
     
     # Render login template
-    template_path = os.path.join('static', 'templates', 'login.html')
-    with open(template_path, 'r', encoding='utf-8') as f:
-        tmpl = Template(f.read())
-    return tmpl.render(error=error, next=next_url)
+    return LOGIN_TEMPLATE.render(error=error, next=next_url)
 
 @app.route('/logout')
 def logout():
@@ -685,224 +1211,273 @@ def index():
     
     return serve_hugo_page('/')
 
+# Setup page, compiled once at startup
+SETUP_TEMPLATE = load_template('setup.html')
+
 def setup_page():
     """Show setup page for configuring Hugo repository"""
     # Check if environment variables are already configured
     has_env_config = bool(config.get('git_repo_url') and config.get('git_token'))
     
-    return f'''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Hugo CMS Setup</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; max-width: 700px; margin: 50px auto; padding: 20px; }}
-        input[type="text"], input[type="password"] {{ width: 100%; padding: 10px; margin: 10px 0; border: 1px solid #ddd; border-radius: 5px; }}
-        button {{ background: #007cba; color: white; padding: 10px 20px; border: none; border-radius: 5px; cursor: pointer; margin: 5px; }}
-        .secondary-btn {{ background: #666; }}
-        .error {{ color: red; margin: 10px 0; }}
-        .success {{ color: green; margin: 10px 0; font-weight: bold; }}
-        .form-group {{ margin: 15px 0; }}
-        label {{ display: block; margin-bottom: 5px; font-weight: bold; }}
-        .help-text {{ font-size: 12px; color: #666; margin-top: 5px; }}
-        .env-config {{ background: #f0f8ff; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #007cba; }}
-        .manual-config {{ background: #fff8dc; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #ffa500; }}
-        pre {{ background: #f4f4f4; padding: 15px; border-radius: 5px; overflow-x: auto; font-size: 14px; }}
-        .toggle-section {{ cursor: pointer; padding: 10px; background: #f8f9fa; border-radius: 5px; margin: 10px 0; }}
-        .hidden {{ display: none; }}
-    </style>
-</head>
-<body>
-    <h1>Hugo CMS Setup</h1>
-    
-    {'<div class="success">✅ Environment variables detected! Repository is ready.</div>' if has_env_config else ''}
-    
-    <div class="env-config">
-        <h2>📁 Recommended: Environment Variables (.env file)</h2>
-        <p>Create a <code>.env</code> file in this directory with your repository configuration:</p>
-        <pre># Hugo CMS Configuration
-HUGO_GIT_REPO_URL=https://github.com/yourusername/your-hugo-site.git
-HUGO_GIT_BRANCH=main
-HUGO_GIT_TOKEN=ghp_xxxxxxxxxxxxxxxxxxxx
-HUGO_WORKING_DIR=/tmp/hugo-cms-work</pre>
-        <p><strong>Benefits:</strong> Secure, version-controllable (add .env to .gitignore), easy deployment</p>
-        {'<button onclick="location.reload()" class="secondary-btn">🔄 Refresh</button>' if not has_env_config else ''}
-        {'<button onclick="setupFromEnv()">🚀 Setup from Environment</button>' if has_env_config else ''}
-    </div>
-    
-    <div class="toggle-section" onclick="toggleManualConfig()">
-        <h2>⚙️ Alternative: Manual Configuration (Click to expand)</h2>
-    </div>
-    
-    <div id="manual-config" class="manual-config hidden">
-        <p><strong>Warning:</strong> This method exposes credentials in the browser. Use only for testing.</p>
-        
-        <form onsubmit="setupRepo(event)">
-            <div class="form-group">
-                <label for="git_repo_url">Git Repository URL:</label>
-                <input type="text" id="git_repo_url" placeholder="https://github.com/username/hugo-site.git" required>
-                <div class="help-text">GitHub, GitLab, or any Git repository URL</div>
-            </div>
-            
-            <div class="form-group">
-                <label for="git_branch">Branch:</label>
-                <input type="text" id="git_branch" placeholder="main" value="main" required>
-                <div class="help-text">Which branch to work with</div>
-            </div>
-            
-            <div class="form-group">
-                <label for="git_token">Access Token:</label>
-                <input type="password" id="git_token" placeholder="ghp_xxxxxxxxxxxx">
-                <div class="help-text">GitHub Personal Access Token or similar credential</div>
-            </div>
-            
-            <button type="submit">Setup Repository</button>
-        </form>
-    </div>
-    
-    <div id="error" class="error"></div>
+    return SETUP_TEMPLATE.render(has_env_config=has_env_config)
+
+IMMUTABLE_ASSET_MAX_AGE = 365 * 24 * 60 * 60
+
+def send_cacheable_file(directory, filename, immutable=False, mimetype=None):
+    """Send a file with conditional request support, cached indefinitely if immutable"""
+    response = send_from_directory(directory, filename, mimetype=mimetype, conditional=True,
+                                   max_age=IMMUTABLE_ASSET_MAX_AGE if immutable else None)
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
+# Hugo's resources.Fingerprint names assets like main.<sha256>.css; their content
+# never changes under the same name, so browsers may cache them indefinitely
+FINGERPRINTED_ASSET_RE = re.compile(r'\.[0-9a-f]{32,}\.[^./]+$')
+
+def send_public_file(full_path, content_type, gzip_path=None):
+    """Send a file from the Hugo public directory with conditional request support
     
-    <script>
-    function toggleManualConfig() {{
-        const manualConfig = document.getElementById('manual-config');
-        manualConfig.classList.toggle('hidden');
-    }}
+    If gzip_path is given, that compressed copy of the file is sent instead.
+    """
+    fingerprinted = FINGERPRINTED_ASSET_RE.search(full_path) is not None
+    if gzip_path is not None:
+        try:
+            response = send_cacheable_file(os.path.dirname(gzip_path), os.path.basename(gzip_path),
+                                           immutable=fingerprinted, mimetype=content_type)
+        except NotFound:
+            pass  # Pruned since it was looked up; send the original instead
+        else:
+            response.headers['Content-Encoding'] = 'gzip'
+            return response
+    public_dir = config['hugo_public_dir']
+    return send_cacheable_file(public_dir, os.path.relpath(full_path, public_dir),
+                               immutable=fingerprinted, mimetype=content_type)
+
+# Text files worth compressing, and the size below which gzip doesn't pay off
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.xml', '.txt')
+MIN_COMPRESS_SIZE = 1024
+
+def accepts_gzip():
+    """Check if the client accepts gzip-encoded responses"""
+    return request.accept_encodings['gzip'] > 0
+
+def gzip_cache_dir():
+    """Directory holding compressed copies of public files, outside the checkout"""
+    return os.path.join(config['working_dir'], 'gzip-cache')
+
+def ensure_gzipped_copy(full_path, file_stat):
+    """Compress a public file into the gzip cache unless done already, returning the copy's path"""
+    # Named after the file and its version, so an edited file gets a new copy
+    # and stale ones are never sent
+    key = f'{full_path}:{file_stat.st_mtime_ns}:{file_stat.st_size}'
+    directory = gzip_cache_dir()
+    name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.gz'
+    gz_path = os.path.join(directory, name)
+    if stat_regular_file(gz_path) is not None:
+        return gz_path
+    
+    with open(full_path, 'rb') as f:
+        data = gzip.compress(f.read(), compresslevel=6, mtime=0)
+    # Other requests may compress the same file at once, so swap the copy in whole
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, gz_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return gz_path
+
+# Seconds a compressed copy is kept after it was written; copies are named by
+# file version, so old ones are never sent, just left behind by edits
+GZIP_CACHE_MAX_AGE = 60 * 60
+
+def prune_gzip_cache():
+    """Delete compressed copies written more than GZIP_CACHE_MAX_AGE seconds ago"""
+    # Copies still in use are simply compressed again on their next request
+    cutoff = time.time() - GZIP_CACHE_MAX_AGE
+    try:
+        with os.scandir(gzip_cache_dir()) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass  # Already gone
+    except FileNotFoundError:
+        pass
+
+PUBLIC_PATH_CACHE_SIZE = 4096
+
+def clear_public_caches():
+    """Forget cached URL resolutions and rendered pages, and prune old compressed files"""
+    public_path_cache.clear()
+    with rendered_html_cache_lock:
+        rendered_html_cache.clear()
+    # Request threads may be about to send a copy, so don't remove the directory
+    prune_gzip_cache()
+
+# Asset URLs that are never rewritten to Hugo's pretty URL patterns
+STATIC_ASSET_EXTENSIONS = ('.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico',
+                           '.woff', '.woff2', '.ttf', '.otf', '.eot')
+
+def stat_regular_file(path):
+    """Return os.stat() of a regular file, or None if path isn't one"""
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    return file_stat if stat.S_ISREG(file_stat.st_mode) else None
+
+def resolve_public_file(file_path):
+    """Find the built file serving a URL path, returning (full_path, os.stat() result, error message)"""
+    # Join onto the normalized public dir by concatenation, since os.path.join
+    # would drop it for a path starting with a slash, then normalize so any
+    # ".." segments are resolved before the containment check below
+    public_dir = os.path.normpath(config['hugo_public_dir'])
+    full_path = os.path.normpath(f"{public_dir}{os.sep}{file_path}")
+    
+    # Refuse ".." segments (including percent-encoded ones) that lead out of
+    # the public directory, before touching the filesystem
+    if os.path.commonpath([full_path, public_dir]) != public_dir:
+        return None, None, "Page not found"
+    
+    # One stat tells whether the path exists, whether it's a directory, and
+    # gives the caller the stat it needs for serving
+    try:
+        file_stat = os.stat(full_path)
+    except OSError:
+        # For static assets, return 404 if not found
+        if file_path.lower().endswith(STATIC_ASSET_EXTENSIONS):
+            return None, None, "Asset not found"
+        
+        # For HTML content, try Hugo's ugly URL pattern; <path>/index.html
+        # can't exist when <path> itself doesn't
+        alt_path = full_path + '.html'
+        alt_stat = stat_regular_file(alt_path)
+        if alt_stat is not None:
+            return alt_path, alt_stat, None
+        return None, None, "Page not found"
     
-    function setupFromEnv() {{
-        const errorDiv = document.getElementById('error');
-        
-        fetch('/setup', {{
-            method: 'POST',
-            headers: {{
-                'Content-Type': 'application/json'
-            }},
-            body: JSON.stringify({{'use_env': true}})
-        }})
-        .then(response => response.json())
-        .then(data => {{
-            if (data.success) {{
-                location.reload();
-            }} else {{
-                errorDiv.textContent = data.message;
-            }}
-        }})
-        .catch(error => {{
-            errorDiv.textContent = 'Error: ' + error.message;
-        }});
-    }}
-    
-    function setupRepo(event) {{
-        event.preventDefault();
-        const gitRepoUrl = document.getElementById('git_repo_url').value;
-        const gitBranch = document.getElementById('git_branch').value;
-        const gitToken = document.getElementById('git_token').value;
-        const errorDiv = document.getElementById('error');
-        
-        const formData = new FormData();
-        formData.append('git_repo_url', gitRepoUrl);
-        formData.append('git_branch', gitBranch);
-        formData.append('git_token', gitToken);
-        
-        // Show loading state
-        event.target.querySelector('button').textContent = 'Setting up...';
-        event.target.querySelector('button').disabled = true;
-        
-        fetch('/setup', {{
-            method: 'POST',
-            body: formData
-        }})
-        .then(response => response.json())
-        .then(data => {{
-            if (data.success) {{
-                location.reload();
-            }} else {{
-                errorDiv.textContent = data.message;
-                event.target.querySelector('button').textContent = 'Setup Repository';
-                event.target.querySelector('button').disabled = false;
-            }}
-        }})
-        .catch(error => {{
-            errorDiv.textContent = 'Error: ' + error.message;
-            event.target.querySelector('button').textContent = 'Setup Repository';
-            event.target.querySelector('button').disabled = false;
-        }});
-    }}
-    </script>
-</body>
-</html>
-    '''
+    # If the path is a directory, try to serve index.html from it
+    if stat.S_ISDIR(file_stat.st_mode):
+        index_path = f"{full_path}{os.sep}index.html"
+        index_stat = stat_regular_file(index_path)
+        if index_stat is not None:
+            return index_path, index_stat, None
+        return None, None, "Page not found"
+    
+    if not stat.S_ISREG(file_stat.st_mode):
+        return None, None, "Page not found"
+    return full_path, file_stat, None
+
+RENDERED_HTML_CACHE_SIZE = 512
+
+def render_hugo_html(full_path, url_path, file_stat):
+    """Return a built page with admin controls injected, as (bytes, ETag, gzipped bytes or None)"""
+    source_file = find_source_file_for_url(url_path)
+    # A rebuild rewrites the file, so its mtime and size tell if the entry is stale
+    stamp = (file_stat.st_mtime_ns, file_stat.st_size, source_file)
+    
+    with rendered_html_cache_lock:
+        cached = rendered_html_cache.get(full_path)
+        if cached is not None and cached[0] == stamp:
+            rendered_html_cache.move_to_end(full_path)
+            return cached[1:]
+    
+    # Splice the page as raw bytes; Hugo writes UTF-8, so no decode is needed
+    with open(full_path, 'rb') as f:
+        body = inject_admin_controls(f.read(), source_file)
+    # Hash the injected output, not the file, so changes to the admin controls
+    # or asset versions also change the ETag
+    etag = hashlib.sha1(body).hexdigest()
+    # Compressed once per render so gzip-capable clients cost no CPU per view
+    gzipped_body = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= MIN_COMPRESS_SIZE else None
+    
+    with rendered_html_cache_lock:
+        rendered_html_cache[full_path] = (stamp, body, etag, gzipped_body)
+        rendered_html_cache.move_to_end(full_path)
+        if len(rendered_html_cache) > RENDERED_HTML_CACHE_SIZE:
+            rendered_html_cache.popitem(last=False)
+    return body, etag, gzipped_body
+
+# Seconds a page view waits for the first build before answering 503, and the
+# Retry-After sent with that answer
+PAGE_BUILD_WAIT = 30
+PAGE_BUILD_RETRY_AFTER = 5
 
 def serve_hugo_page(url_path):
     """Serve Hugo page with admin controls injected"""
     if not config['hugo_site_built']:
-        success, message = build_hugo_site()
+        # Wait for the build on the background worker so it can't overlap
+        # another job, but don't hold the request thread behind a slow clone
+        future = jobs[submit_build_job()]
+        done, _ = wait([future], timeout=PAGE_BUILD_WAIT)
+        if not done:
+            return ("<h1>Building</h1><p>The site is still being built. Try again in a moment.</p>",
+                    503, {'Retry-After': str(PAGE_BUILD_RETRY_AFTER)})
+        success, message = future.result()
         if not success:
             return f"<h1>Build Error</h1><p>{message}</p>", 500
     
-    # Handle root path
-    if url_path == '/':
-        file_path = 'index.html'
-    else:
-        file_path = url_path.strip('/')
-    
-    full_path = os.path.join(config['hugo_public_dir'], file_path)
-    
-    # If direct path doesn't exist, try alternative paths for HTML content
-    if not os.path.exists(full_path):
-        # For HTML content, try Hugo's pretty URL patterns
-        if not any(file_path.endswith(ext) for ext in ['.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.woff', '.woff2', '.ttf', '.otf', '.eot']):
-            alternatives = [
-                os.path.join(config['hugo_public_dir'], file_path + '.html'),
-                os.path.join(config['hugo_public_dir'], file_path, 'index.html'),
-                os.path.join(config['hugo_public_dir'], file_path + '/index.html')
-            ]
-            
-            for alt_path in alternatives:
-                if os.path.exists(alt_path):
-                    full_path = alt_path
-                    break
-            else:
-                return "Page not found", 404
-        else:
-            # For static assets, return 404 if not found
-            return "Asset not found", 404
-    
-    # If the path is a directory, try to serve index.html from it
-    if os.path.isdir(full_path):
-        index_path = os.path.join(full_path, 'index.html')
-        if os.path.exists(index_path):
-            full_path = index_path
-        else:
-            return "Page not found", 404
-    
-    # Determine content type based on file extension
-    content_type = get_content_type(full_path)
-    
-    # For binary files, read in binary mode
-    if is_binary_file(full_path):
-        try:
-            with open(full_path, 'rb') as f:
-                file_content = f.read()
-            return Response(file_content, mimetype=content_type)
-        except Exception as e:
-            return f"Error reading binary file: {e}", 500
+    # Handle root path; leading and trailing slashes are optional
+    file_path = url_path.strip('/') or 'index.html'
+    
+    # A cached match only needs re-checking that the built file still exists;
+    # the stat result is reused for the HTML cache check below
+    full_path = public_path_cache.get(file_path)
+    file_stat = stat_regular_file(full_path) if full_path is not None else None
+    if file_stat is None:
+        full_path, file_stat, message = resolve_public_file(file_path)
+        if file_stat is None:
+            return message, 404
+        if len(public_path_cache) >= PUBLIC_PATH_CACHE_SIZE:
+            public_path_cache.clear()  # Bound the cache without tracking recency
+        public_path_cache[file_path] = full_path
+    
+    # Everything except HTML is passed straight to the WSGI file wrapper
+    # (sendfile where the server supports it) instead of being read into memory
+    if not full_path.endswith('.html'):
+        content_type = get_content_type(full_path)
+        if not full_path.endswith(COMPRESSIBLE_EXTENSIONS) or file_stat.st_size < MIN_COMPRESS_SIZE:
+            return send_public_file(full_path, content_type)
+        
+        # Text assets are compressed once into the gzip cache, and the copy
+        # is then sent with sendfile like any other file
+        gzip_path = None
+        if accepts_gzip():
+            try:
+                gzip_path = ensure_gzipped_copy(full_path, file_stat)
+            except OSError as e:
+                print(f"Error compressing {full_path}: {e}")
+        response = send_public_file(full_path, content_type, gzip_path=gzip_path)
+        response.vary.add('Accept-Encoding')
+        return response
     
-    # For text files, read in text mode
+    # HTML gets admin controls injected, served from cache while unchanged
     try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            file_content = f.read()
+        body, etag, gzipped_body = render_hugo_html(full_path, url_path, file_stat)
     except Exception as e:
         return f"Error reading file: {e}", 500
     
-    # Only inject admin controls for HTML files
-    if full_path.endswith('.html'):
-        # Find corresponding source file
-        source_file = find_source_file_for_url(url_path)
-        
-        # Inject admin controls
-        file_content = inject_admin_controls(file_content, source_file)
-    
-    return Response(file_content, mimetype=content_type)
+    if gzipped_body is not None and accepts_gzip():
+        response = Response(gzipped_body, mimetype=CONTENT_TYPES['.html'])
+        response.headers['Content-Encoding'] = 'gzip'
+        etag = f'{etag}-gzip'
+    else:
+        response = Response(body, mimetype=CONTENT_TYPES['.html'])
+    response.vary.add('Accept-Encoding')
+    
+    # Browsers revalidate on every view and get a bodiless 304 while the page
+    # is unchanged
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/setup', methods=['POST'])
 def setup():
@@ -952,49 +1527,69 @@ def setup():
 @require_auth
 def api_build():
     """API endpoint to build Hugo site"""
-    success, message = build_hugo_site()
-    return jsonify({'success': success, 'message': message})
+    job_id = submit_build_job()
+    return jsonify({'success': True, 'message': 'Build queued', 'job_id': job_id}), 202
 
 @app.route('/admin/api/publish', methods=['POST'])
 @require_auth
 def api_publish():
     """API endpoint to publish changes to Git repository"""
-    # First, pull any remote changes to avoid conflicts
-    pull_success, pull_message = setup_git_repo()
-    if not pull_success:
-        return jsonify({'success': False, 'message': f'Failed to pull latest changes: {pull_message}'})
-    
-    # Commit and push local changes
-    success, message = commit_and_push_changes()
-    return jsonify({'success': success, 'message': message})
+    job_id = submit_job(publish_changes, get_client_ip())
+    return jsonify({'success': True, 'message': 'Publish queued', 'job_id': job_id}), 202
 
 @app.route('/admin/api/clear-cache', methods=['POST'])
 @require_auth
 def api_clear_cache():
     """API endpoint to clear the repository cache and re-clone"""
-    try:
-        # Clear the cached repository (this also resets config)
-        clear_success, clear_message = clear_cached_repo()
-        if not clear_success:
-            return jsonify({'success': False, 'message': clear_message})
-        
-        # Re-setup the repository
-        setup_success, setup_message = setup_git_repo()
-        if not setup_success:
-            return jsonify({'success': False, 'message': f'Cache cleared but failed to re-clone: {setup_message}'})
-        
-        # Rebuild the site after re-cloning
-        build_success, build_message = build_hugo_site()
-        if not build_success:
-            return jsonify({'success': False, 'message': f'Re-cloned successfully but build failed: {build_message}'})
-        
-        # Restart the file watcher
-        start_file_watcher()
-        
-        return jsonify({'success': True, 'message': 'Repository cache cleared, re-cloned, and rebuilt successfully'})
-    
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Cache clear error: {str(e)}'})
+    # {"rebuild": false} leaves the build to the first page request
+    data = request.get_json(silent=True) or {}
+    job_id = submit_job(refresh_cached_repo, data.get('rebuild') is not False)
+    return jsonify({'success': True, 'message': 'Cache clear queued', 'job_id': job_id}), 202
+
+@app.route('/admin/api/jobs/<job_id>')
+@require_auth
+def api_job_status(job_id):
+    """API endpoint to poll a background build/publish job"""
+    status = get_job_status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify(status)
+
+# Seconds between keep-alive checks while a streamed job is still running
+JOB_EVENTS_INTERVAL = 1.0
+
+# Each open stream holds a request thread, so streams end after this many
+# seconds and EventSource reconnects (after JOB_EVENTS_RETRY_MS) to resume
+JOB_EVENTS_MAX_DURATION = 15.0
+JOB_EVENTS_RETRY_MS = 500
+
+@app.route('/admin/api/jobs/<job_id>/events')
+@require_auth
+def api_job_events(job_id):
+    """API endpoint streaming a job's status as server-sent events until it finishes"""
+    with jobs_lock:
+        future = jobs.get(job_id)
+    if future is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    
+    def generate():
+        yield f"retry: {JOB_EVENTS_RETRY_MS}\n\n"
+        deadline = time.monotonic() + JOB_EVENTS_MAX_DURATION
+        last_status = None
+        while time.monotonic() < deadline:
+            status = get_job_status(job_id)
+            if status is None:
+                return  # Pruned while streaming
+            if status != last_status:
+                yield f"data: {json.dumps(status)}\n\n"
+                last_status = status
+            if status['status'] == 'done':
+                return
+            # Wake up as soon as the job finishes instead of polling on a timer
+            wait([future], timeout=JOB_EVENTS_INTERVAL)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/admin/api/get-content/<path:file_path>')
 @require_auth
@@ -1002,21 +1597,74 @@ def api_get_content(file_path):
     """API endpoint to get markdown file content"""
     full_path = os.path.join(config['hugo_repo_path'], 'content', file_path)
     
-    if not os.path.exists(full_path):
-        return jsonify({'success': False, 'message': 'File not found'})
-    
     try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
+        # Read the whole file and decode it once rather than through a text
+        # wrapper; a missing file surfaces from open() without a separate stat
+        with open(full_path, 'rb') as f:
+            post = frontmatter.loads(f.read().decode('utf-8'))
         
         return jsonify({
             'success': True,
             'frontmatter': post.metadata,
             'content': post.content
         })
+    except FileNotFoundError:
+        return jsonify({'success': False, 'message': 'File not found'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+# Read once at import, since os.umask() can only be read by setting it, which
+# would race file creation on other threads
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+def replace_file_contents(path, data, exclusive=False):
+    """Replace a file's contents atomically so readers never see a partial write
+    
+    With exclusive=True the file must not exist yet, and FileExistsError is
+    raised if it does.
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        # hugo server and the file watcher see a new file as soon as it's
+        # created, so it's staged like a replacement, with default permissions
+        mode = 0o666 & ~UMASK
+    else:
+        if exclusive:
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), path)
+    
+    directory, name = os.path.split(path)
+    # Hidden temporary name in the same directory so Hugo skips it and the
+    # final rename stays on one filesystem
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)  # mkstemp creates files as 0600
+        if exclusive:
+            # Unlike a rename, a hard link refuses to overwrite a file
+            # created in the meantime
+            os.link(tmp_path, path)
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def collect_frontmatter(form):
+    """Collect non-empty fm_* form fields into a frontmatter dict"""
+    frontmatter_data = {}
+    for key, value in form.items():
+        if not key.startswith('fm_'):
+            continue
+        value = value.strip()
+        if value:
+            frontmatter_data[key[3:]] = value  # Remove 'fm_' prefix
+    return frontmatter_data
+
 @app.route('/admin/api/save/<path:file_path>', methods=['POST'])
 @require_auth
 def api_save_file(file_path):
@@ -1024,29 +1672,27 @@ def api_save_file(file_path):
     full_path = os.path.join(config['hugo_repo_path'], 'content', file_path)
     
     try:
-        frontmatter_data = {}
-        for key, value in request.form.items():
-            if key.startswith('fm_') and value.strip():
-                fm_key = key[3:]  # Remove 'fm_' prefix
-                frontmatter_data[fm_key] = value.strip()
-        
-        content = request.form.get('content', '')
+        form = request.form  # Look up the parsed form once
+        frontmatter_data = collect_frontmatter(form)
+        content = form.get('content', '')
         
         # Use the formatting preservation function to maintain original style
         formatted_content = preserve_frontmatter_format(full_path, frontmatter_data, content)
         
+        # Any hugo server render finishing after this point may include the save
+        render_baseline = hugo_server_render_count()
+        written_at = time.monotonic()
         # Write back to file with Unix line endings
-        with open(full_path, 'wb') as f:
-            f.write(formatted_content.encode('utf-8'))
+        replace_file_contents(full_path, formatted_content.encode('utf-8'))
+        record_cms_write(full_path, written_at)
         
         # Log security event
-        client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR', 'unknown'))
-        security_logger.info(f"FILE_SAVE - Modified file: {file_path} from IP: {client_ip}")
+        security_logger.info("FILE_SAVE - Modified file: %s from IP: %s", file_path, get_client_ip())
         
-        # Rebuild site
-        build_hugo_site()
+        # Rebuild site in the background
+        job_id = submit_build_job(render_baseline)
         
-        return jsonify({'success': True, 'message': 'File saved successfully'})
+        return jsonify({'success': True, 'message': 'File saved successfully', 'job_id': job_id}), 202
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
@@ -1055,7 +1701,8 @@ def api_save_file(file_path):
 def api_create_file():
     """API endpoint to create a new markdown file"""
     try:
-        filename = request.form.get('filename')
+        form = request.form  # Look up the parsed form once
+        filename = form.get('filename')
         if not filename:
             return jsonify({'success': False, 'message': 'Filename is required'})
         
@@ -1078,27 +1725,29 @@ def api_create_file():
         os.makedirs(os.path.dirname(full_path), exist_ok=True)
         
         # Prepare frontmatter
-        frontmatter_data = {}
-        for key, value in request.form.items():
-            if key.startswith('fm_') and value.strip():
-                fm_key = key[3:]  # Remove 'fm_' prefix
-                frontmatter_data[fm_key] = value.strip()
+        frontmatter_data = collect_frontmatter(form)
         
-        content = request.form.get('content', '')
+        content = form.get('content', '')
         
         # Create new post
         post = frontmatter.Post(content, **frontmatter_data)
         
-        # Write to file with Unix line endings
-        with open(full_path, 'w', encoding='utf-8', newline='\n') as f:
-            f.write(frontmatter.dumps(post))
+        render_baseline = hugo_server_render_count()  # As for saves
+        written_at = time.monotonic()
+        # Write to file with Unix line endings, encoded once like saves
+        try:
+            replace_file_contents(full_path, frontmatter.dumps(post).encode('utf-8'), exclusive=True)
+        except FileExistsError:
+            return jsonify({'success': False, 'message': 'File already exists'})
+        record_cms_write(full_path, written_at)
+        clear_source_file_lookups()
+        mark_url_source_map_stale()
         
         # Log security event
-        client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR', 'unknown'))
-        security_logger.info(f"FILE_CREATE - Created new file: {filename} from IP: {client_ip}")
+        security_logger.info("FILE_CREATE - Created new file: %s from IP: %s", filename, get_client_ip())
         
-        # Rebuild site
-        build_hugo_site()
+        # Rebuild site in the background
+        job_id = submit_build_job(render_baseline)
         
         # Generate the URL for the new page
         # Remove .md extension and create proper Hugo URL
@@ -1109,8 +1758,9 @@ def api_create_file():
         return jsonify({
             'success': True, 
             'message': f'File {filename} created successfully',
-            'url': url_path
-        })
+            'url': url_path,
+            'job_id': job_id
+        }), 202
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
@@ -1118,41 +1768,64 @@ def api_create_file():
 @app.route('/admin/static/css/<filename>')
 def admin_css(filename):
     """Serve admin CSS files"""
-    return send_from_directory('static/css', filename)
+    return send_cacheable_file('static/css', filename, immutable='v' in request.args)
 
 @app.route('/admin/static/js/<filename>')
 def admin_js(filename):
     """Serve admin JavaScript files"""
-    return send_from_directory('static/js', filename)
+    return send_cacheable_file('static/js', filename, immutable='v' in request.args)
 
 # Catch-all route to serve Hugo pages
 @app.route('/<path:path>')
 @require_auth
 def serve_hugo_content(path):
     """Serve any Hugo page with admin controls injected"""
-    return serve_hugo_page('/' + path)
+    return serve_hugo_page(path)
+
+def initialize_repo():
+    """Re-clone the configured Git repository, run once at startup"""
+    if not config.get('git_repo_url'):
+        return
+    
+    print(f"Setting up Git repository: {config['git_repo_url']}")
+    
+    # Clear any existing cached repository on startup
+    clear_success, clear_message = clear_cached_repo()
+    if not clear_success:
+        print(f"Warning: {clear_message}")
+    
+    success, message = setup_git_repo()
+    if success:
+        print(f"Git repository ready: {message}")
+    else:
+        print(f"Git setup warning: {message}")
+
+def run_startup():
+    """Clone the repository and start the file watcher, as a background job"""
+    try:
+        initialize_repo()
+        start_file_watcher()
+    except Exception as e:
+        # Keep serving (the setup page still works) rather than take the worker down
+        print(f"Startup error: {e}")
+        return False, f"Startup error: {str(e)}"
+    return True, "Startup finished"
 
 if __name__ == '__main__':
+    # app.run is Werkzeug's development server; production deployments run
+    # the app under gunicorn (see gunicorn.conf.py), which serves files with sendfile
+    if os.environ.get('HUGO_CMS_DEV') != '1':
+        print("Set HUGO_CMS_DEV=1 to run the development server, or use:")
+        print("  gunicorn -c gunicorn.conf.py app:app")
+        sys.exit(1)
+    
     # Load existing configuration
     saved_config = load_config()
     config.update(saved_config)
     
     # Only run setup in the main process, not in Flask's debug reloader subprocess
     if os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
-        # If Git repository is configured, set it up
-        if config.get('git_repo_url'):
-            print(f"Setting up Git repository: {config['git_repo_url']}")
-            
-            # Clear any existing cached repository on startup
-            clear_success, clear_message = clear_cached_repo()
-            if not clear_success:
-                print(f"Warning: {clear_message}")
-            
-            success, message = setup_git_repo()
-            if success:
-                print(f"Git repository ready: {message}")
-            else:
-                print(f"Git setup warning: {message}")
+        initialize_repo()
         
         print("Hugo CMS Companion starting...")
         print(f"Access the application at: http://localhost:5000")
@@ -0,0 +1,24 @@
+# Gunicorn settings for serving the Hugo CMS in production
+#
+#   gunicorn -c gunicorn.conf.py app:app
+
+bind = '0.0.0.0:5000'
+
+# The repository state, page caches and build worker all live in-process, so
+# run a single worker process and get concurrency from threads instead
+workers = 1
+worker_class = 'gthread'
+threads = 8
+
+# sendfile is on by default: files returned by send_from_directory go through
+# wsgi.file_wrapper, which gunicorn sends with os.sendfile
+
+
+def post_worker_init(worker):
+    """Load saved settings and queue the repository clone, as `python app.py` clones it"""
+    # gunicorn imports app.py as a module, so its __main__ block never runs
+    import app
+    app.config.update(app.load_config())
+    # Run it on the job worker: the worker sends no heartbeat until it
+    # serves, and an exception here would stop the whole server
+    app.submit_job(app.run_startup)
@@ -19,7 +19,6 @@ echo "🚀 Starting Hugo CMS container..."
 docker run -d \
   --name $CONTAINER_NAME \
   -p 5000:5000 \
-  -e GIT_PYTHON_REFRESH=quiet \
   -e FLASK_ENV=development \
   -e FLASK_DEBUG=1 \
   -v hugo_cms_data:/tmp/hugo-cms-work \
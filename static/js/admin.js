@@ -114,6 +114,27 @@ function showNotification(message, isSuccess = true) {
     }, 4000);
 }
 
+function waitForJob(jobId) {
+    // Follow a background build/publish job's status stream until it finishes
+    return new Promise((resolve, reject) => {
+        const events = new EventSource(`/admin/api/jobs/${encodeURIComponent(jobId)}/events`);
+        events.onmessage = event => {
+            const job = JSON.parse(event.data);
+            if (job.status === 'done' || !job.success) {
+                events.close();
+                resolve(job);
+            }
+        };
+        events.onerror = () => {
+            // The server ends long streams on purpose; EventSource reconnects
+            // by itself unless the job (or the connection) is gone for good
+            if (events.readyState === EventSource.CLOSED) {
+                reject(new Error('Lost connection while waiting for the job to finish'));
+            }
+        };
+    });
+}
+
 function editCurrentPage() {
     if (!currentSourceFile) {
         alert('No source file found for this page');
@@ -232,6 +253,11 @@ function savePage(event, filePath) {
         body: formData
     })
     .then(response => response.json())
+    .then(data => {
+        // Wait for the rebuild so the reloaded page shows the change
+        if (!data.success || !data.job_id) return data;
+        return waitForJob(data.job_id).then(job => job.success ? data : job);
+    })
     .then(data => {
         // Reset loading state
         setButtonLoading(submitButton, false, originalButtonText);
@@ -276,6 +302,7 @@ function rebuildSite() {
             }
             return response.json();
         })
+        .then(data => data && data.job_id ? waitForJob(data.job_id) : data)
         .then(data => {
             if (!data) return; // Skip if redirected
             // Reset loading state
@@ -317,6 +344,7 @@ function publishChanges() {
         }
         return response.json();
     })
+    .then(data => data && data.job_id ? waitForJob(data.job_id) : data)
     .then(data => {
         if (!data) return; // Skip if redirected
         // Reset loading state
@@ -355,6 +383,7 @@ function clearCache() {
         }
         return response.json();
     })
+    .then(data => data && data.job_id ? waitForJob(data.job_id) : data)
     .then(data => {
         if (!data) return; // Skip if redirected
         // Reset loading state